@@ -30,9 +30,6 @@ from apps.app import (
 import os
 from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
-
 # Page configuration
 st.set_page_config(
     page_title="Stock Search Assistant",
@@ -41,184 +38,16 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Custom CSS for modern, responsive design
-st.markdown("""
-<style>
-    /* Import modern font */
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
-    
-    /* Global styles */
-    * {
-        font-family: 'Inter', sans-serif;
-    }
-    
-    /* Main container */
-    .main {
-        padding: 2rem 1rem;
-        max-width: 1400px;
-        margin: 0 auto;
-    }
-    
-    /* Header styling */
-    .header-container {
-        text-align: center;
-        padding: 2rem 0 3rem 0;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        border-radius: 20px;
-        margin-bottom: 2rem;
-        box-shadow: 0 10px 40px rgba(102, 126, 234, 0.3);
-    }
-    
-    .header-title {
-        color: white;
-        font-size: 2.5rem;
-        font-weight: 700;
-        margin: 0;
-        text-shadow: 2px 2px 4px rgba(0,0,0,0.1);
-    }
-    
-    .header-subtitle {
-        color: rgba(255, 255, 255, 0.9);
-        font-size: 1.1rem;
-        margin-top: 0.5rem;
-        font-weight: 400;
-    }
-    
-    /* Search input styling */
-    .stTextInput > div > div > input {
-        border-radius: 15px;
-        border: 2px solid #e0e0e0;
-        padding: 1rem 1.5rem;
-        font-size: 1.05rem;
-        transition: all 0.3s ease;
-    }
-    
-    .stTextInput > div > div > input:focus {
-        border-color: #667eea;
-        box-shadow: 0 0 0 3px rgba(102, 126, 234, 0.1);
-    }
-    
-    /* Button styling */
-    .stButton > button {
-        width: 100%;
-        border-radius: 15px;
-        padding: 0.75rem 2rem;
-        font-size: 1.05rem;
-        font-weight: 600;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        border: none;
-        color: white;
-        transition: all 0.3s ease;
-        box-shadow: 0 4px 15px rgba(102, 126, 234, 0.4);
-    }
-    
-    .stButton > button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 6px 20px rgba(102, 126, 234, 0.5);
-    }
-    
-    /* Response card styling */
-    .response-card {
-        background: white;
-        border-radius: 20px;
-        padding: 2rem;
-        margin: 1.5rem 0;
-        box-shadow: 0 4px 20px rgba(0, 0, 0, 0.08);
-        border: 1px solid #f0f0f0;
-        animation: slideIn 0.4s ease;
-    }
-    
-    @keyframes slideIn {
-        from {
-            opacity: 0;
-            transform: translateY(20px);
-        }
-        to {
-            opacity: 1;
-            transform: translateY(0);
-        }
-    }
-    
-    /* Section headers */
-    .section-header {
-        color: #667eea;
-        font-size: 1.3rem;
-        font-weight: 600;
-        margin: 1.5rem 0 1rem 0;
-        padding-bottom: 0.5rem;
-        border-bottom: 2px solid #f0f0f0;
-    }
-    
-    /* Info boxes */
-    .info-box {
-        background: linear-gradient(135deg, #f5f7fa 0%, #f0f3f7 100%);
-        border-left: 4px solid #667eea;
-        border-radius: 10px;
-        padding: 1rem 1.5rem;
-        margin: 1rem 0;
-    }
-    
-    .info-label {
-        color: #667eea;
-        font-weight: 600;
-        font-size: 0.9rem;
-        text-transform: uppercase;
-        letter-spacing: 0.5px;
-    }
-    
-    .info-value {
-        color: #333;
-        font-size: 1.05rem;
-        margin-top: 0.3rem;
-    }
-    
-    /* Performance metrics */
-    .perf-metric {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        border-radius: 15px;
-        padding: 1.5rem;
-        text-align: center;
-        color: white;
-        box-shadow: 0 4px 15px rgba(102, 126, 234, 0.3);
-    }
-    
-    .perf-label {
-        font-size: 0.9rem;
-        opacity: 0.9;
-        font-weight: 500;
-    }
-    
-    .perf-value {
-        font-size: 2rem;
-        font-weight: 700;
-        margin-top: 0.3rem;
-    }
-    
-    /* Mobile responsiveness */
-    @media (max-width: 768px) {
-        .header-title {
-            font-size: 1.8rem;
-        }
-        
-        .header-subtitle {
-            font-size: 0.95rem;
-        }
-        
-        .response-card {
-            padding: 1.5rem;
-        }
-        
-        .perf-value {
-            font-size: 1.5rem;
-        }
-    }
-    
-    /* Hide Streamlit elements */
-    #MainMenu {visibility: hidden;}
-    footer {visibility: hidden;}
-    header {visibility: hidden;}
-</style>
-""", unsafe_allow_html=True)
+# Custom CSS for modern, responsive design (apps/static/app.css)
+@st.cache_resource
+def load_css():
+    """Read the app stylesheet once per process and wrap it in a <style> tag."""
+    css_path = Path(__file__).parent / "static" / "app.css"
+    return f"<style>\n{css_path.read_text(encoding='utf-8')}</style>"
+
+# Streamlit drops elements that a rerun does not emit, so the cached
+# stylesheet is still injected on every run.
+st.markdown(load_css(), unsafe_allow_html=True)
 
 # Header
 st.markdown("""
@@ -231,8 +60,8 @@ st.markdown("""
 # ============================================================
 # Environment Configuration with Caching
 # ============================================================
-# Streamlit's @st.cache_data decorator ensures environment variables
-# are loaded only once and cached across all user sessions.
+# Streamlit's @st.cache_resource decorator ensures environment variables
+# are loaded only once and shared across all user sessions.
 #
 # Performance Benefits:
 #   - Avoids repeated file I/O for .env loading
@@ -244,13 +73,15 @@ st.markdown("""
 #   - Cleared only on app restart or manual cache clear
 # ============================================================
 
-@st.cache_data
+@st.cache_resource
 def get_config():
     """
     Load and cache environment configuration for Azure Search.
     
     This function is called once and the result is cached for all users.
     Streamlit automatically manages cache invalidation and persistence.
+    The .env file is loaded here rather than at the top of the script, so
+    it is read and parsed once instead of on every rerun.
     
     Returns:
         Dictionary with:
@@ -259,9 +90,12 @@ def get_config():
             - 'api_key': API key for authentication
             
     Note:
-        Using @st.cache_data improves performance by avoiding repeated
-        environment variable lookups on every user interaction.
+        Using @st.cache_resource improves performance by avoiding repeated
+        environment variable lookups on every user interaction. Unlike
+        @st.cache_data it returns the same dict without pickling a copy,
+        so callers must treat it as read-only.
     """
+    load_dotenv()
     return {
         'endpoint': os.getenv("AZURE_SEARCH_ENDPOINT"),
         'index': os.getenv("AZURE_SEARCH_INDEX_NAME"),
@@ -278,18 +112,21 @@ if not all([SERVICE_ENDPOINT, INDEX_NAME, API_KEY]):
     st.stop()
 
 # Search input section
-col1, col2 = st.columns([4, 1])
+# The input lives in a form so a search is issued only on submit (button
+# click or Enter), not on every rerun while the text box holds a query.
+with st.form("search_form", border=False):
+    col1, col2 = st.columns([4, 1])
 
-with col1:
-    user_query = st.text_input(
-        "Search Query",
-        placeholder="e.g., 'nifty 50 stocks', 'axis bank', 'it stocks with pe less than 20'",
-        label_visibility="collapsed",
-        key="search_input"
-    )
+    with col1:
+        user_query = st.text_input(
+            "Search Query",
+            placeholder="e.g., 'nifty 50 stocks', 'axis bank', 'it stocks with pe less than 20'",
+            label_visibility="collapsed",
+            key="search_input"
+        )
 
-with col2:
-    search_button = st.button(" Search", use_container_width=True)
+    with col2:
+        search_button = st.form_submit_button(" Search", use_container_width=True)
 
 # Example queries section
 with st.expander(" Example Queries", expanded=False):
@@ -304,13 +141,24 @@ with st.expander(" Example Queries", expanded=False):
     </div>
     """, unsafe_allow_html=True)
 
+# Optional metric fields shown in the results table: (field, column label)
+METRIC_DISPLAY_COLUMNS = (
+    ("PE", "PE"),
+    ("PB", "PB"),
+    ("MarketCapCr", "Market Cap (Cr)"),
+    ("EPS", "EPS"),
+    ("DividendYieldPct", "Dividend %"),
+)
+
+# Largest raw response (in serialized characters) rendered in Technical Details
+RAW_RESPONSE_MAX_CHARS = 20_000
+
 # ============================================================
 # Main Search Flow with Performance Instrumentation
 # ============================================================
 # This section handles user queries and measures performance at key stages:
 #
-# Timestamp Breakdown:
-#   t0: Total start (includes Streamlit rendering overhead)
+# Timestamp Breakdown (time.perf_counter_ns, monotonic):
 #   t1: Input received (query parsing begins)
 #   t2: Before Azure Search API call
 #   t3: After Azure Search API response
@@ -319,7 +167,8 @@ with st.expander(" Example Queries", expanded=False):
 #   - Query parsing time: t2 - t1 (typically 1-5ms)
 #   - Azure Search API time: t3 - t2 (160-350ms with connection pooling)
 #   - Total backend time: t3 - t1 (parsing + API + processing)
-#   - Total execution time: Displayed at end (includes UI rendering)
+#   Rendering time is not reported: Streamlit streams elements to the
+#   browser asynchronously, so a timer around st.markdown calls is noise.
 #
 # Performance Optimization:
 #   - Connection pooling reduces API time by 80% (1400ms → 160-350ms)
@@ -327,15 +176,12 @@ with st.expander(" Example Queries", expanded=False):
 #   - Timestamp tracking helps identify bottlenecks for debugging
 # ============================================================
 
-# Process search when button is clicked or Enter is pressed
-if search_button or user_query:
+# Process search when the form is submitted (button click or Enter)
+if search_button:
     if user_query and user_query.strip():
-        # Timestamp 0: Total start (including Streamlit overhead)
-        t0_total_start = time.time()
-        
         with st.spinner(" Searching..."):
             # Timestamp 1: Input received
-            t1_input_received = time.time()
+            t1_input_received = time.perf_counter_ns()
             
             try:
                 # Build search request (parse query → spec → REST API params)
@@ -347,18 +193,18 @@ if search_button or user_query:
                 )
                 
                 # Timestamp 2: Before Azure AI Search call
-                t2_before_search = time.time()
+                t2_before_search = time.perf_counter_ns()
                 
                 # Execute search (uses connection-pooled HTTP session or SDK)
                 result = execute_search_request(req)
                 
                 # Timestamp 3: After receiving response
-                t3_response_received = time.time()
+                t3_response_received = time.perf_counter_ns()
                 
                 # Calculate time breakdowns for performance analysis
-                time_parsing_ms = (t2_before_search - t1_input_received) * 1000
-                time_search_ms = (t3_response_received - t2_before_search) * 1000
-                time_total_ms = (t3_response_received - t1_input_received) * 1000
+                time_parsing_ms = (t2_before_search - t1_input_received) / 1e6
+                time_search_ms = (t3_response_received - t2_before_search) / 1e6
+                time_total_ms = (t3_response_received - t1_input_received) / 1e6
                 
                 # Display results in a modern card
                 st.markdown('<div class="response-card">', unsafe_allow_html=True)
@@ -448,28 +294,19 @@ if search_button or user_query:
                     st.markdown(f"**Found {total_count} results** (showing {len(results)})")
                     
                     if results:
-                        # Convert to display format
-                        display_data = []
-                        for item in results:
-                            row = {
-                                "Symbol": item.get("Symbol", ""),
-                                "Name": item.get("Name", ""),
-                                "Sector": item.get("Sector", ""),
-                            }
-                            
-                            # Add available metrics
-                            if "PE" in item:
-                                row["PE"] = item["PE"]
-                            if "PB" in item:
-                                row["PB"] = item["PB"]
-                            if "MarketCapCr" in item:
-                                row["Market Cap (Cr)"] = item["MarketCapCr"]
-                            if "EPS" in item:
-                                row["EPS"] = item["EPS"]
-                            if "DividendYieldPct" in item:
-                                row["Dividend %"] = item["DividendYieldPct"]
-                            
-                            display_data.append(row)
+                        # Build the table column by column: st.dataframe
+                        # turns a dict of lists straight into columns instead
+                        # of inferring a schema from one dict per row.
+                        display_data = {
+                            "Symbol": [item.get("Symbol", "") for item in results],
+                            "Name": [item.get("Name", "") for item in results],
+                            "Sector": [item.get("Sector", "") for item in results],
+                        }
+                        
+                        # Add available metrics
+                        for field, label in METRIC_DISPLAY_COLUMNS:
+                            if any(field in item for item in results):
+                                display_data[label] = [item.get(field) for item in results]
                         
                         # Display as table (optimized rendering)
                         st.dataframe(
@@ -487,18 +324,18 @@ if search_button or user_query:
                     st.markdown("**Request Payload:**")
                     st.json(req["json"])
                     
-                    st.markdown("**Full Response:**")
-                    st.json(result["response"])
+                    # Expander content is sent to the browser even while
+                    # collapsed, so large responses are capped.
+                    response_json = json.dumps(result["response"], indent=2)
+                    if len(response_json) <= RAW_RESPONSE_MAX_CHARS:
+                        st.markdown("**Full Response:**")
+                        st.json(result["response"])
+                    else:
+                        st.markdown(f"**Response (first {RAW_RESPONSE_MAX_CHARS:,} of {len(response_json):,} characters):**")
+                        st.code(response_json[:RAW_RESPONSE_MAX_CHARS], language="json")
                 
                 st.markdown('</div>', unsafe_allow_html=True)
                 
-                # Total execution time (including rendering)
-                t4_total_end = time.time()
-                total_execution_ms = (t4_total_end - t0_total_start) * 1000
-                streamlit_overhead_ms = total_execution_ms - time_total_ms
-                
-                st.info(f"📊 **Full Execution:** {total_execution_ms:.0f}ms total ({time_total_ms:.0f}ms API + {streamlit_overhead_ms:.0f}ms rendering)")
-                
             except Exception as e:
                 st.error(f" Error processing query: {str(e)}")
                 st.exception(e)
@@ -33,21 +33,27 @@ Example Queries:
     - "Get all data for INFY"
 """
 
+import logging
 import os
 import re
-import json
+import threading
 import time
 from typing import Dict, Any, List, Optional, Tuple
 from dotenv import load_dotenv
 
 # Import existing modules
-from src.query_parser import parse_user_query
-from src.db_parser import get_latest_stock_data, get_stock_aggregation
-import requests
+from src.query_parser import parse_user_query, normalize
+from src.payload_builder import STOCK_SEARCH_FIELDS
+from src.db_parser import get_latest_stock_data, get_stock_aggregation, shared_http_session
+import orjson
 
 # Load environment variables
 load_dotenv()
 
+# Progress and timing details go to this logger at DEBUG level, so they cost
+# nothing unless enabled. main() turns them on with STOCK_SEARCH_VERBOSE=1.
+logger = logging.getLogger("search_app_cosmos")
+
 # Configuration
 AZURE_SEARCH_ENDPOINT = os.getenv("AZURE_SEARCH_ENDPOINT")
 AZURE_SEARCH_INDEX = os.getenv("AZURE_SEARCH_INDEX_NAME", "stocks-search-index")
@@ -56,6 +62,40 @@ AZURE_SEARCH_API_KEY = os.getenv("AZURE_SEARCH_API_KEY")
 # Load Cosmos DB field configuration
 COSMOS_CONFIG_PATH = "config/cosmos_config.json"
 
+# Aggregation keywords, matched as whole words ("min" must not fire on
+# "Minda" or "administration", nor "top" on "stop")
+MAX_AGGREGATION_WORDS = frozenset({"highest", "maximum", "max", "peak", "top"})
+MIN_AGGREGATION_WORDS = frozenset({"lowest", "minimum", "min", "bottom"})
+_WORD_RE = re.compile(r"[a-z]+")
+
+# Resolved symbols keyed on the normalized stock query. A company's symbol
+# changes rarely, so repeat queries can skip the Azure AI Search round trip.
+SYMBOL_CACHE_TTL_SECONDS = 3600
+SYMBOL_CACHE_MAX_ENTRIES = 2048
+_symbol_cache: Dict[str, Tuple[float, Tuple[str, str]]] = {}
+_symbol_cache_lock = threading.Lock()
+
+
+def _get_cached_symbol(cache_key: str) -> Optional[Tuple[str, str]]:
+    """Return a cached (SymbolRaw, Symbol) pair if present and not expired, else None."""
+    with _symbol_cache_lock:
+        entry = _symbol_cache.get(cache_key)
+        if entry is None:
+            return None
+        expires_at, symbols = entry
+        if expires_at < time.monotonic():
+            del _symbol_cache[cache_key]
+            return None
+        return symbols
+
+
+def _store_cached_symbol(cache_key: str, symbols: Tuple[str, str]) -> None:
+    """Store a resolved symbol pair, evicting the oldest entry once the cache is full."""
+    with _symbol_cache_lock:
+        if cache_key not in _symbol_cache and len(_symbol_cache) >= SYMBOL_CACHE_MAX_ENTRIES:
+            _symbol_cache.pop(next(iter(_symbol_cache)))
+        _symbol_cache[cache_key] = (time.monotonic() + SYMBOL_CACHE_TTL_SECONDS, symbols)
+
 
 class CosmosDynamicQueryApp:
     """
@@ -68,21 +108,25 @@ class CosmosDynamicQueryApp:
     def __init__(self):
         """Initialize the application with configuration."""
         self.load_cosmos_config()
-        self.session = requests.Session()
-        print("\n" + "="*80)
-        print("Stock Search Application - Cosmos DB Integration")
-        print("search_app_cosmos.py")
-        print("="*80)
-        print("Initialized successfully!\n")
+        # Share db_parser's pooled session with the Cosmos DB client
+        self.session = shared_http_session
+        # Search URL and headers are fixed for the app's lifetime. The api-key is
+        # sent per request rather than set on the shared session, which also
+        # carries Cosmos DB traffic.
+        self.search_url = f"{AZURE_SEARCH_ENDPOINT}/indexes/{AZURE_SEARCH_INDEX}/docs/search?api-version=2024-07-01"
+        self.search_headers = {
+            "Content-Type": "application/json",
+            "api-key": AZURE_SEARCH_API_KEY
+        }
     
     def load_cosmos_config(self):
         """Load Cosmos DB field configuration from JSON file."""
         try:
-            with open(COSMOS_CONFIG_PATH, 'r') as f:
-                self.cosmos_config = json.load(f)
-            print(f"✓ Loaded Cosmos DB configuration from {COSMOS_CONFIG_PATH}")
+            with open(COSMOS_CONFIG_PATH, 'rb') as f:
+                self.cosmos_config = orjson.loads(f.read())
+            logger.info("Loaded Cosmos DB configuration from %s", COSMOS_CONFIG_PATH)
         except FileNotFoundError:
-            print(f"✗ Warning: {COSMOS_CONFIG_PATH} not found. Using default configuration.")
+            logger.warning("%s not found. Using default configuration.", COSMOS_CONFIG_PATH)
             self.cosmos_config = {
                 "fields": {
                     "Price": {"cosmos_field": "Price", "aliases": ["price"]},
@@ -91,6 +135,13 @@ class CosmosDynamicQueryApp:
                 },
                 "always_return": ["Symbol", "DateTime"]
             }
+        
+        # Lower-cased aliases per field, in config order, built once so query
+        # parsing does not re-read the config dicts and re-lower every alias
+        self.field_aliases = tuple(
+            (field_name, tuple(alias.lower() for alias in field_config.get("aliases", [])))
+            for field_name, field_config in self.cosmos_config["fields"].items()
+        )
     
     def parse_fields_from_query(self, query: str) -> Tuple[List[str], float]:
         """
@@ -110,20 +161,16 @@ class CosmosDynamicQueryApp:
         start_time = time.time()
         query_lower = query.lower()
         
-        requested_fields = []
-        
         # Check each field's aliases
-        for field_name, field_config in self.cosmos_config["fields"].items():
-            aliases = field_config.get("aliases", [])
-            for alias in aliases:
-                if alias.lower() in query_lower:
-                    if field_name not in requested_fields:
-                        requested_fields.append(field_name)
-                    break
+        requested_fields = [
+            field_name
+            for field_name, aliases in self.field_aliases
+            if any(alias in query_lower for alias in aliases)
+        ]
         
         # If no specific fields mentioned, return all fields
         if not requested_fields:
-            requested_fields = list(self.cosmos_config["fields"].keys())
+            requested_fields = [field_name for field_name, _ in self.field_aliases]
         
         parse_time = (time.time() - start_time) * 1000
         return requested_fields, parse_time
@@ -144,32 +191,33 @@ class CosmosDynamicQueryApp:
             "maximum change percent" → ("MAX", "ChangePercent")
         """
         query_lower = query.lower()
+        words = _WORD_RE.findall(query_lower)
         
         # Detect aggregation type
         aggregation = None
-        if any(word in query_lower for word in ["highest", "maximum", "max", "peak", "top"]):
+        if not MAX_AGGREGATION_WORDS.isdisjoint(words):
             aggregation = "MAX"
-        elif any(word in query_lower for word in ["lowest", "minimum", "min", "bottom"]):
+        elif not MIN_AGGREGATION_WORDS.isdisjoint(words):
             aggregation = "MIN"
         
         if not aggregation:
             return None, None
         
         # Detect which field to aggregate
-        for field_name, field_config in self.cosmos_config["fields"].items():
-            aliases = field_config.get("aliases", [])
-            for alias in aliases:
-                if alias.lower() in query_lower:
-                    return aggregation, field_name
+        for field_name, aliases in self.field_aliases:
+            if any(alias in query_lower for alias in aliases):
+                return aggregation, field_name
         
         return None, None
     
-    def resolve_symbol_from_ai_search(self, query: str) -> Tuple[Optional[str], Optional[str], float]:
+    def resolve_symbol_from_ai_search(self, query: str, spec: Optional[Dict[str, Any]] = None) -> Tuple[Optional[str], Optional[str], float]:
         """
         Use Azure AI Search to resolve stock symbol from user query.
         
         Args:
             query (str): User's natural language query
+            spec (dict, optional): Parsed query spec from parse_user_query(query);
+                parsed here when not supplied
             
         Returns:
             Tuple of (SymbolRaw, Symbol, time in ms)
@@ -179,46 +227,49 @@ class CosmosDynamicQueryApp:
         """
         start_time = time.time()
         
-        # Parse query using existing logic
-        spec = parse_user_query(query)
+        # Parse query using existing logic unless the caller already did
+        if spec is None:
+            spec = parse_user_query(query)
         
         # Build simplified payload for symbol resolution only
         # Don't use build_search_payload_from_spec to avoid including metric fields
         stock_query = spec.get("stock_query", query)
         
+        # Serve previously resolved symbols without calling Azure AI Search
+        cache_key = normalize(stock_query)
+        cached = _get_cached_symbol(cache_key)
+        if cached is not None:
+            logger.debug("   Search Query: %s (cached)", stock_query)
+            return (*cached, 0.0)
+        
         payload = {
             "search": stock_query,
-            "searchFields": "SymbolRaw,Name,Symbol",
+            "searchFields": STOCK_SEARCH_FIELDS,
             "top": 1,
-            "select": "SymbolRaw,Name,Symbol"
+            "select": STOCK_SEARCH_FIELDS
         }
         
         # Execute Azure AI Search query
-        url = f"{AZURE_SEARCH_ENDPOINT}/indexes/{AZURE_SEARCH_INDEX}/docs/search?api-version=2024-07-01"
-        headers = {
-            "Content-Type": "application/json",
-            "api-key": AZURE_SEARCH_API_KEY
-        }
+        logger.debug("   Search Query: %s", stock_query)
         
-        print(f"   Search Query: {stock_query}")
-        
-        response = self.session.post(url, json=payload, headers=headers)
+        response = self.session.post(self.search_url, data=orjson.dumps(payload), headers=self.search_headers)
         search_time = (time.time() - start_time) * 1000
         
         if response.status_code != 200:
-            print(f"✗ Azure AI Search error: {response.status_code}")
             try:
-                error_details = response.json()
-                print(f"   Error details: {json.dumps(error_details, indent=2)}")
-            except:
-                print(f"   Error response: {response.text}")
+                error_details = orjson.dumps(orjson.loads(response.content), option=orjson.OPT_INDENT_2).decode()
+            except orjson.JSONDecodeError:
+                error_details = response.text
+            logger.warning("Azure AI Search error: %s\n   Error details: %s", response.status_code, error_details)
             return None, None, search_time
         
-        results = response.json()
+        results = orjson.loads(response.content)
         if results.get("value") and len(results["value"]) > 0:
             first_result = results["value"][0]
             symbol_raw = first_result.get("SymbolRaw")
             symbol = first_result.get("Symbol")
+            if symbol_raw:
+                _store_cached_symbol(cache_key, (symbol_raw, symbol))
             return symbol_raw, symbol, search_time
         
         return None, None, search_time
@@ -234,45 +285,46 @@ class CosmosDynamicQueryApp:
             Dictionary with results and timing information
         """
         total_start = time.time()
-        print(f"\n{'='*80}")
-        print(f"Processing Query: {query}")
-        print(f"{'='*80}\n")
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("\n%s\nProcessing Query: %s\n%s\n", "=" * 80, query, "=" * 80)
         
         timing = {}
         
         # Step 1: Parse user query to detect fields
-        print("Step 1: Parsing user query for requested fields...")
-        requested_fields, parse_time = self.parse_fields_from_query(query)
+        logger.debug("Step 1: Parsing user query for requested fields...")
+        # The query spec is parsed here too, once, and handed to the resolver
+        parse_start = time.time()
+        requested_fields, _ = self.parse_fields_from_query(query)
+        spec = parse_user_query(query)
+        parse_time = (time.time() - parse_start) * 1000
         timing["field_parsing"] = parse_time
-        print(f"   Requested Fields: {requested_fields}")
-        print(f"   ⏱️  Parse Time: {parse_time:.2f}ms\n")
+        if debug:
+            logger.debug("   Requested Fields: %s\n   ⏱️  Parse Time: %.2fms\n", requested_fields, parse_time)
         
         # Step 1b: Check for aggregation
         aggregation_type, agg_field = self.detect_aggregation(query)
         if aggregation_type:
-            print(f"   Detected Aggregation: {aggregation_type} of {agg_field}\n")
+            logger.debug("   Detected Aggregation: %s of %s\n", aggregation_type, agg_field)
         
         # Step 2: Resolve symbol using Azure AI Search
-        print("Step 2: Resolving stock symbol using Azure AI Search...")
-        symbol_raw, symbol, search_time = self.resolve_symbol_from_ai_search(query)
+        logger.debug("Step 2: Resolving stock symbol using Azure AI Search...")
+        symbol_raw, symbol, search_time = self.resolve_symbol_from_ai_search(query, spec)
         timing["ai_search"] = search_time
         
         if not symbol_raw:
-            total_time = (time.time() - total_start) * 1000
-            timing["total"] = total_time
-            print(f"   ✗ Could not resolve stock symbol from query")
-            print(f"   ⏱️  Total Time: {total_time:.2f}ms\n")
+            timing["total"] = (time.time() - total_start) * 1000
             return {
                 "success": False,
                 "error": "Could not identify stock symbol in query",
                 "timing": timing
             }
         
-        print(f"   Resolved Symbol: {symbol_raw} ({symbol})")
-        print(f"   ⏱️  AI Search Time: {search_time:.2f}ms\n")
+        if debug:
+            logger.debug("   Resolved Symbol: %s (%s)\n   ⏱️  AI Search Time: %.2fms\n", symbol_raw, symbol, search_time)
         
         # Step 3: Query Cosmos DB
-        print("Step 3: Querying Cosmos DB for real-time data...")
+        logger.debug("Step 3: Querying Cosmos DB for real-time data...")
         cosmos_start = time.time()
         
         if aggregation_type and agg_field:
@@ -286,10 +338,7 @@ class CosmosDynamicQueryApp:
         timing["cosmos_query"] = cosmos_time
         
         if not result:
-            total_time = (time.time() - total_start) * 1000
-            timing["total"] = total_time
-            print(f"   ✗ No data found in Cosmos DB for {symbol_raw}")
-            print(f"   ⏱️  Total Time: {total_time:.2f}ms\n")
+            timing["total"] = (time.time() - total_start) * 1000
             return {
                 "success": False,
                 "error": f"No data found for {symbol_raw}",
@@ -297,24 +346,7 @@ class CosmosDynamicQueryApp:
             }
         
         # Step 4: Return results
-        total_time = (time.time() - total_start) * 1000
-        timing["total"] = total_time
-        
-        print(f"\n{'='*80}")
-        print("Results:")
-        print(f"{'='*80}")
-        for key, value in result.items():
-            print(f"   {key}: {value}")
-        
-        print(f"\n{'='*80}")
-        print("Performance Metrics:")
-        print(f"{'='*80}")
-        print(f"   Field Parsing:        {timing['field_parsing']:.2f}ms")
-        print(f"   AI Search:            {timing['ai_search']:.2f}ms")
-        print(f"   Cosmos DB Query:      {timing['cosmos_query']:.2f}ms")
-        print(f"   ─────────────────────────────────")
-        print(f"   Total Time:           {timing['total']:.2f}ms")
-        print(f"{'='*80}\n")
+        timing["total"] = (time.time() - total_start) * 1000
         
         return {
             "success": True,
@@ -325,6 +357,10 @@ class CosmosDynamicQueryApp:
     
     def run_interactive(self):
         """Run the application in interactive console mode."""
+        print("\n" + "="*80)
+        print("Stock Search Application - Cosmos DB Integration")
+        print("search_app_cosmos.py")
+        print("="*80)
         print("\nWelcome to the Stock Search Application (Cosmos DB Integration)!")
         print("\nThis app integrates Azure AI Search with Cosmos DB for real-time stock data.")
         print("\nExample queries:")
@@ -346,7 +382,29 @@ class CosmosDynamicQueryApp:
                     print("\nThank you for using the application. Goodbye!")
                     break
                 
-                self.process_query(query)
+                outcome = self.process_query(query)
+                timing = outcome["timing"]
+                
+                if not outcome["success"]:
+                    print(f"\n   ✗ {outcome['error']}")
+                    print(f"   ⏱️  Total Time: {timing['total']:.2f}ms\n")
+                    continue
+                
+                print(f"\n{'='*80}")
+                print("Results:")
+                print(f"{'='*80}")
+                for key, value in outcome["data"].items():
+                    print(f"   {key}: {value}")
+                
+                print(f"\n{'='*80}")
+                print("Performance Metrics:")
+                print(f"{'='*80}")
+                print(f"   Field Parsing:        {timing['field_parsing']:.2f}ms")
+                print(f"   AI Search:            {timing['ai_search']:.2f}ms")
+                print(f"   Cosmos DB Query:      {timing['cosmos_query']:.2f}ms")
+                print(f"   ─────────────────────────────────")
+                print(f"   Total Time:           {timing['total']:.2f}ms")
+                print(f"{'='*80}\n")
                 
             except KeyboardInterrupt:
                 print("\n\nInterrupted by user. Goodbye!")
@@ -357,6 +415,9 @@ class CosmosDynamicQueryApp:
 
 def main():
     """Main entry point for the application."""
+    # Step-by-step progress and per-query Cosmos DB logs are opt-in
+    verbose = os.getenv("STOCK_SEARCH_VERBOSE", "0") == "1"
+    logging.basicConfig(level=logging.DEBUG if verbose else logging.WARNING, format="%(message)s")
     app = CosmosDynamicQueryApp()
     app.run_interactive()
 
@@ -9,7 +9,8 @@ Features:
 - Get min/max aggregations for any field
 - Dynamic query construction based on requested fields
 - Efficient partition-key based queries
-- Query logging with performance metrics
+- Short-TTL in-process result cache for repeated symbol lookups
+- Query logging with performance metrics (DEBUG level on this module's logger)
 - Connection pooling for optimal performance
 
 Requirements:
@@ -18,11 +19,18 @@ Requirements:
 - Environment variables in .env file
 """
 
+import functools
+import logging
 import os
+import threading
 import time
-from typing import List, Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Dict, Any, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from azure.core.pipeline.transport import RequestsTransport
 from azure.cosmos import CosmosClient
-from azure.identity import DefaultAzureCredential
+from azure.identity import DefaultAzureCredential, ManagedIdentityCredential
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -33,6 +41,120 @@ COSMOS_ENDPOINT = os.getenv("COSMOS_ENDPOINT", "https://<your-account>.documents
 DATABASE_NAME = os.getenv("DATABASE_NAME", "db001")
 CONTAINER_NAME = os.getenv("CONTAINER_NAME", "stocks-dynamic-data")
 
+# Optional comma-separated Azure regions to read from, nearest first
+# (e.g. "Central India,South India"). Without it the SDK routes reads to the
+# account's write region, which may be far from where this app runs.
+COSMOS_PREFERRED_LOCATIONS = [
+    region.strip()
+    for region in os.getenv("COSMOS_PREFERRED_LOCATIONS", "").split(",")
+    if region.strip()
+]
+
+# Per-query log (query text, parameters, timings, result) at DEBUG level. The
+# records carry "symbol", "source", "exec_ms" and "total_ms" attributes for
+# metrics handlers; nothing is formatted unless DEBUG is enabled.
+logger = logging.getLogger(__name__)
+
+# Dynamic fields stored per price document, and the supported aggregations
+DYNAMIC_FIELDS = ('Price', 'Change', 'ChangePercent')
+VALID_FIELDS = frozenset(DYNAMIC_FIELDS)
+VALID_AGGREGATIONS = frozenset(('MIN', 'MAX'))
+
+# Upper bound on concurrent Cosmos DB queries issued by get_latest_data_many()
+MULTI_SYMBOL_MAX_WORKERS = 16
+
+# One pooled requests.Session for this module's Azure traffic. The Cosmos
+# client's transport wraps it (urllib3 keeps a separate pool per host), and
+# apps that also call Azure AI Search over REST in the same process, such as
+# search_app_cosmos.py, post through it too instead of opening a second
+# Session. pool_maxsize matches the multi-symbol fan-out; urllib3's default of
+# 10 would discard connections under get_latest_data_many().
+shared_http_session = requests.Session()
+shared_http_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=MULTI_SYMBOL_MAX_WORKERS))
+
+
+@functools.lru_cache(maxsize=1)
+def get_credential():
+    """
+    Return the process-wide Azure credential for Cosmos DB.
+    
+    On Azure hosts that expose a managed identity endpoint (App Service,
+    Functions, Container Apps, AKS with MSI) the managed identity is used
+    directly, skipping DefaultAzureCredential's probe chain. Elsewhere the
+    default chain is kept for local development (environment, Azure CLI,
+    PowerShell), minus the IDE and shared-cache probes this app never uses.
+    Set AZURE_CLIENT_ID to select a user-assigned identity.
+    """
+    if os.getenv("IDENTITY_ENDPOINT") or os.getenv("MSI_ENDPOINT"):
+        return ManagedIdentityCredential(client_id=os.getenv("AZURE_CLIENT_ID"))
+    return DefaultAzureCredential(
+        exclude_visual_studio_code_credential=True,
+        exclude_shared_token_cache_credential=True,
+    )
+
+
+# ============================================================
+# Result Caching
+# ============================================================
+# Agents and users tend to probe the same symbol several times in a row
+# ("price of reliance", then "reliance change"), so query results are kept
+# in-process for a short TTL and served without another Cosmos DB round-trip.
+#
+# The latest row is cached whole (all dynamic fields), so later requests for
+# any subset of its fields are answered from the same entry. Min/max results
+# move slowly and are cached for longer.
+LATEST_CACHE_TTL_SECONDS = 2
+AGGREGATION_CACHE_TTL_SECONDS = 30
+RESULT_CACHE_MAX_ENTRIES = 1024
+_result_cache: Dict[Tuple, Tuple[float, dict]] = {}
+# The helpers below may be called from several threads at once
+_result_cache_lock = threading.Lock()
+
+# Latest-data query: always selects every dynamic field so the cached row can
+# serve any field subset (the query is partition-key bound, so the extra
+# columns cost no additional RUs)
+LATEST_DATA_QUERY = """
+        SELECT TOP 1 c.Symbol, c.DateTime, c.Price, c.Change, c.ChangePercent
+        FROM c
+        WHERE c.Symbol = @symbol
+        ORDER BY c.DateTime DESC
+        """
+
+# Min/max queries: one fixed text per (field, aggregation), built once at
+# import. ORDER BY the field and take TOP 1 - for MAX we want DESC (highest
+# first), for MIN we want ASC (lowest first).
+AGGREGATION_QUERIES = {
+    (field, aggregation): f"""
+        SELECT TOP 1 c.Symbol, c.DateTime, c.{field}
+        FROM c
+        WHERE c.Symbol = @symbol
+        ORDER BY c.{field} {sort_order}
+        """
+    for field in DYNAMIC_FIELDS
+    for aggregation, sort_order in (('MAX', 'DESC'), ('MIN', 'ASC'))
+}
+
+
+def _get_cached_result(cache_key: Tuple) -> Optional[dict]:
+    """Return a cached query result if present and not expired, else None."""
+    with _result_cache_lock:
+        entry = _result_cache.get(cache_key)
+        if entry is None:
+            return None
+        expires_at, data = entry
+        if expires_at < time.monotonic():
+            del _result_cache[cache_key]
+            return None
+        return data
+
+
+def _store_cached_result(cache_key: Tuple, data: dict, ttl_seconds: float) -> None:
+    """Store a query result, evicting the oldest entry once the cache is full."""
+    with _result_cache_lock:
+        if cache_key not in _result_cache and len(_result_cache) >= RESULT_CACHE_MAX_ENTRIES:
+            _result_cache.pop(next(iter(_result_cache)))
+        _result_cache[cache_key] = (time.monotonic() + ttl_seconds, data)
+
 
 class CosmosDBStockQuery:
     """
@@ -52,6 +174,7 @@ class CosmosDBStockQuery:
     _client = None
     _database = None
     _container = None
+    _init_lock = threading.Lock()
     
     def __init__(self):
         """
@@ -59,16 +182,29 @@ class CosmosDBStockQuery:
         
         Uses singleton pattern to ensure only one client instance is created,
         which enables connection pooling and improves performance.
+        Creation is guarded by a lock (double-checked), so concurrent first
+        calls cannot build a second credential and client; later calls skip
+        the lock.
         """
-        # Only create client once (singleton pattern for connection pooling)
-        if CosmosDBStockQuery._client is None:
-            init_start = time.time()
-            credential = DefaultAzureCredential()
-            CosmosDBStockQuery._client = CosmosClient(url=COSMOS_ENDPOINT, credential=credential)
-            CosmosDBStockQuery._database = CosmosDBStockQuery._client.get_database_client(DATABASE_NAME)
-            CosmosDBStockQuery._container = CosmosDBStockQuery._database.get_container_client(CONTAINER_NAME)
-            init_time = (time.time() - init_start) * 1000
-            print(f"[Connection] Cosmos DB client initialized in {init_time:.2f}ms\n")
+        # Only create client once (singleton pattern for connection pooling).
+        # _container is assigned last, so seeing it set means all three are.
+        if CosmosDBStockQuery._container is None:
+            with CosmosDBStockQuery._init_lock:
+                if CosmosDBStockQuery._container is None:
+                    init_start = time.time()
+                    credential = get_credential()
+                    client_kwargs = {
+                        "transport": RequestsTransport(session=shared_http_session, session_owner=False)
+                    }
+                    if COSMOS_PREFERRED_LOCATIONS:
+                        client_kwargs["preferred_locations"] = COSMOS_PREFERRED_LOCATIONS
+                    client = CosmosClient(url=COSMOS_ENDPOINT, credential=credential, **client_kwargs)
+                    database = client.get_database_client(DATABASE_NAME)
+                    CosmosDBStockQuery._client = client
+                    CosmosDBStockQuery._database = database
+                    CosmosDBStockQuery._container = database.get_container_client(CONTAINER_NAME)
+                    init_time = (time.time() - init_start) * 1000
+                    logger.debug("[Connection] Cosmos DB client initialized in %.2fms\n", init_time)
         
         # Use class-level clients
         self.client = CosmosDBStockQuery._client
@@ -113,59 +249,61 @@ class CosmosDBStockQuery:
         
         # Default to all fields if none specified
         if fields is None:
-            fields = ['Price', 'Change', 'ChangePercent']
+            fields = DYNAMIC_FIELDS
         
         # Validate fields
-        prep_start = time.time()
-        valid_fields = {'Price', 'Change', 'ChangePercent'}
-        requested_fields = set(fields)
-        invalid_fields = requested_fields - valid_fields
-        if invalid_fields:
-            raise ValueError(f"Invalid fields: {invalid_fields}. Valid fields are: {valid_fields}")
+        if not VALID_FIELDS.issuperset(fields):
+            invalid_fields = set(fields) - VALID_FIELDS
+            raise ValueError(f"Invalid fields: {invalid_fields}. Valid fields are: {set(VALID_FIELDS)}")
         
-        # Build dynamic SELECT clause - always include Symbol and DateTime
-        select_fields = ['c.Symbol', 'c.DateTime'] + [f'c.{field}' for field in fields]
-        select_clause = ', '.join(select_fields)
+        query = LATEST_DATA_QUERY
+        params = [{"name": "@symbol", "value": symbol}]
         
-        # Construct query
-        query = f"""
-        SELECT TOP 1 {select_clause}
-        FROM c
-        WHERE c.Symbol = @symbol
-        ORDER BY c.DateTime DESC
-        """
+        # Serve from the cached full row when it is still fresh
+        cache_key = ("latest", symbol)
+        row = _get_cached_result(cache_key)
+        source = "cache"
+        exec_time = 0.0
+        if row is None:
+            source = "Cosmos DB"
+            
+            # Execute query
+            exec_start = time.time()
+            row = next(iter(
+                self.container.query_items(
+                    query=query,
+                    parameters=params,
+                    enable_cross_partition_query=False,  # Optimized for partition key
+                    max_item_count=1  # TOP 1: a single one-item page
+                )
+            ), None)
+            exec_time = (time.time() - exec_start) * 1000
+            
+            if row is not None:
+                _store_cached_result(cache_key, row, LATEST_CACHE_TTL_SECONDS)
         
-        params = [{"name": "@symbol", "value": symbol}]
-        prep_time = (time.time() - prep_start) * 1000
+        # Project the requested fields - always include Symbol and DateTime
+        result = None
+        if row is not None:
+            result = {key: row[key] for key in ('Symbol', 'DateTime', *fields) if key in row}
         
         # Log query for debugging
-        print(f"\n{'='*80}")
-        print(f"[Cosmos DB Query - Latest Data]")
-        print(f"{'='*80}")
-        print(f"Symbol: {symbol}")
-        print(f"Fields: {fields}")
-        print(f"Query: {query.strip()}")
-        print(f"Parameters: {params}")
-        print(f"⏱️  Query Preparation Time: {prep_time:.2f}ms")
-        
-        # Execute query
-        exec_start = time.time()
-        items = list(
-            self.container.query_items(
-                query=query,
-                parameters=params,
-                enable_cross_partition_query=False  # Optimized for partition key
+        if logger.isEnabledFor(logging.DEBUG):
+            total_time = (time.time() - total_start) * 1000
+            logger.debug(
+                "\n%s\n[Cosmos DB Query - Latest Data]\n%s\n"
+                "Symbol: %s\n"
+                "Fields: %s\n"
+                "Query: %s\n"
+                "Parameters: %s\n"
+                "Source: %s\n"
+                "⏱️  Query Execution Time: %.2fms\n"
+                "⏱️  Total Time: %.2fms\n"
+                "Result: %s\n%s\n",
+                "=" * 80, "=" * 80, symbol, fields, query.strip(), params, source,
+                exec_time, total_time, result, "=" * 80,
+                extra={"symbol": symbol, "source": source, "exec_ms": exec_time, "total_ms": total_time}
             )
-        )
-        exec_time = (time.time() - exec_start) * 1000
-        
-        result = items[0] if items else None
-        total_time = (time.time() - total_start) * 1000
-        
-        print(f"⏱️  Query Execution Time: {exec_time:.2f}ms")
-        print(f"⏱️  Total Time: {total_time:.2f}ms")
-        print(f"Result: {result}")
-        print(f"{'='*80}\n")
         
         return result
     
@@ -208,74 +346,92 @@ class CosmosDBStockQuery:
         total_start = time.time()
         
         # Validate inputs
-        prep_start = time.time()
-        valid_fields = {'Price', 'Change', 'ChangePercent'}
-        if field not in valid_fields:
-            raise ValueError(f"Invalid field: {field}. Valid fields are: {valid_fields}")
+        if field not in VALID_FIELDS:
+            raise ValueError(f"Invalid field: {field}. Valid fields are: {set(VALID_FIELDS)}")
         
-        valid_aggregations = {'MIN', 'MAX'}
         aggregation = aggregation.upper()
-        if aggregation not in valid_aggregations:
-            raise ValueError(f"Invalid aggregation: {aggregation}. Valid values are: {valid_aggregations}")
-        
-        # Determine sort order based on aggregation type
-        # For MAX, we want DESC (highest first), for MIN we want ASC (lowest first)
-        sort_order = "DESC" if aggregation == "MAX" else "ASC"
+        if aggregation not in VALID_AGGREGATIONS:
+            raise ValueError(f"Invalid aggregation: {aggregation}. Valid values are: {set(VALID_AGGREGATIONS)}")
         
         # Single optimized query - ORDER BY the field and get TOP 1
-        query = f"""
-        SELECT TOP 1 c.Symbol, c.DateTime, c.{field}
-        FROM c
-        WHERE c.Symbol = @symbol
-        ORDER BY c.{field} {sort_order}
-        """
+        query = AGGREGATION_QUERIES[(field, aggregation)]
         
         params = [{"name": "@symbol", "value": symbol}]
-        prep_time = (time.time() - prep_start) * 1000
-        
-        print(f"\n{'='*80}")
-        print(f"[Cosmos DB Query - Aggregation (Optimized Single Query)]")
-        print(f"{'='*80}")
-        print(f"Symbol: {symbol}")
-        print(f"Field: {field}")
-        print(f"Aggregation: {aggregation}")
-        print(f"Query: {query.strip()}")
-        print(f"Parameters: {params}")
-        print(f"⏱️  Query Preparation Time: {prep_time:.2f}ms")
         
-        # Execute query
-        exec_start = time.time()
-        items = list(
-            self.container.query_items(
-                query=query,
-                parameters=params,
-                enable_cross_partition_query=False  # Optimized for partition key
-            )
-        )
-        exec_time = (time.time() - exec_start) * 1000
+        cache_key = ("aggregation", symbol, field, aggregation)
+        cached = _get_cached_result(cache_key)
+        source = "cache"
+        exec_time = 0.0
+        if cached is not None:
+            result = dict(cached)
+        else:
+            source = "Cosmos DB"
+            
+            # Execute query
+            exec_start = time.time()
+            result = next(iter(
+                self.container.query_items(
+                    query=query,
+                    parameters=params,
+                    enable_cross_partition_query=False,  # Optimized for partition key
+                    max_item_count=1  # TOP 1: a single one-item page
+                )
+            ), None)
+            exec_time = (time.time() - exec_start) * 1000
+            
+            if result is not None:
+                # Rename the field to include aggregation type for clarity
+                agg_field_name = f"{aggregation.capitalize()}{field}"
+                result[agg_field_name] = result.pop(field)
+                _store_cached_result(cache_key, dict(result), AGGREGATION_CACHE_TTL_SECONDS)
         
-        if not items:
+        if logger.isEnabledFor(logging.DEBUG):
             total_time = (time.time() - total_start) * 1000
-            print(f"⏱️  Query Execution Time: {exec_time:.2f}ms")
-            print(f"⏱️  Total Time: {total_time:.2f}ms")
-            print(f"Result: No data found for symbol {symbol}")
-            print(f"{'='*80}\n")
-            return None
-        
-        result = items[0]
-        
-        # Rename the field to include aggregation type for clarity
-        agg_field_name = f"{aggregation.capitalize()}{field}"
-        result[agg_field_name] = result.pop(field)
+            result_text = result if result is not None else f"No data found for symbol {symbol}"
+            logger.debug(
+                "\n%s\n[Cosmos DB Query - Aggregation (Optimized Single Query)]\n%s\n"
+                "Symbol: %s\n"
+                "Field: %s\n"
+                "Aggregation: %s\n"
+                "Query: %s\n"
+                "Parameters: %s\n"
+                "Source: %s\n"
+                "⏱️  Query Execution Time: %.2fms\n"
+                "⏱️  Total Time: %.2fms\n"
+                "Result: %s\n%s\n",
+                "=" * 80, "=" * 80, symbol, field, aggregation, query.strip(), params, source,
+                exec_time, total_time, result_text, "=" * 80,
+                extra={"symbol": symbol, "source": source, "exec_ms": exec_time, "total_ms": total_time}
+            )
         
-        total_time = (time.time() - total_start) * 1000
+        return result
+    
+    def get_latest_data_many(
+        self,
+        symbols: List[str],
+        fields: Optional[List[str]] = None
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Get the latest data for several symbols concurrently.
         
-        print(f"⏱️  Query Execution Time: {exec_time:.2f}ms")
-        print(f"⏱️  Total Time: {total_time:.2f}ms")
-        print(f"Result: {result}")
-        print(f"{'='*80}\n")
+        Each symbol is a separate partition-key query, so the lookups are
+        independent and network-bound: N symbols finish in roughly one
+        round-trip instead of N. The shared container client is thread-safe;
+        a thread pool keeps the synchronous SDK (the async client would need
+        an extra aiohttp transport).
         
-        return result
+        Args:
+            symbols (List[str]): Stock ticker symbols
+            fields (List[str], optional): Fields to retrieve, as in get_latest_data()
+            
+        Returns:
+            list: One result per symbol, in the same order as symbols
+            (None where no data was found)
+        """
+        if not symbols:
+            return []
+        with ThreadPoolExecutor(max_workers=min(len(symbols), MULTI_SYMBOL_MAX_WORKERS)) as executor:
+            return list(executor.map(lambda symbol: self.get_latest_data(symbol, fields), symbols))
 
 
 # Convenience functions for easy import
@@ -297,6 +453,24 @@ def get_latest_stock_data(
     return query.get_latest_data(symbol, fields)
 
 
+def get_latest_stock_data_many(
+    symbols: List[str],
+    fields: Optional[List[str]] = None
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Convenience function to get latest stock data for several symbols concurrently.
+    
+    Args:
+        symbols (List[str]): Stock ticker symbols
+        fields (List[str], optional): Fields to retrieve ['Price', 'Change', 'ChangePercent']
+        
+    Returns:
+        list: Latest data per symbol, in input order (None where not found)
+    """
+    query = CosmosDBStockQuery()
+    return query.get_latest_data_many(symbols, fields)
+
+
 def get_stock_aggregation(
     symbol: str,
     field: str,
@@ -319,6 +493,8 @@ def get_stock_aggregation(
 
 # Example usage and testing
 if __name__ == "__main__":
+    # Show the per-query log when run directly
+    logging.basicConfig(level=logging.DEBUG, format="%(message)s")
     print("=" * 80)
     print("Testing Cosmos DB Stock Query Functions")
     print("=" * 80)
@@ -5,7 +5,19 @@ Converts parsed query specifications into Azure Search REST API payloads.
 This module is shared across app.py and app_sdk.py to avoid code duplication.
 """
 
-from typing import Dict, Any, Optional
+import functools
+from typing import Dict, Any, Optional, Tuple
+
+
+# OData comparison operators produced by query_parser's COMPARATOR_ALIASES
+_ODATA_COMPARISON_OPS = frozenset({"lt", "gt", "le", "ge"})
+
+
+def _format_odata_number(value: Any) -> str:
+    """Format a filter value as an OData literal, writing whole floats as integers (20.0 -> 20)."""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
 
 
 def build_metric_filter_odata(metric_filter: Dict[str, Any]) -> Optional[str]:
@@ -27,10 +39,202 @@ def build_metric_filter_odata(metric_filter: Dict[str, Any]) -> Optional[str]:
         return None
 
     # op already mapped to lt/gt/le/ge
-    if op not in ("lt", "gt", "le", "ge"):
+    if op not in _ODATA_COMPARISON_OPS:
+        return None
+
+    return f"{metric} {op} {_format_odata_number(value)}"
+
+
+# Baseline select set for overviews
+OVERVIEW_SELECT = "Symbol,SymbolRaw,Name,Sector,MarketCapCr,PE,PB,EPS,DividendYieldPct,AllIndices"
+
+# Fields matched by single-stock searches, also the minimal select for metric lookups
+STOCK_SEARCH_FIELDS = "SymbolRaw,Name,Symbol"
+_STOCK_ESSENTIAL_FIELDS = ("SymbolRaw", "Name", "Symbol")
+
+# Select list shared by the filtered list modes; the filtered metric is appended
+_FILTER_LIST_SELECT_FIELDS = ("SymbolRaw", "Name", "Symbol", "Sector")
+_FILTER_LIST_SELECT = ",".join(_FILTER_LIST_SELECT_FIELDS)
+
+
+def _odata_string(value: str) -> str:
+    """Quote a value as an OData string literal (single quotes doubled)."""
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _index_filter(index_code: Optional[str]) -> Optional[str]:
+    """OData clause matching stocks in an index, or None when no index is given."""
+    if not index_code:
+        return None
+    return f"AllIndices/any(i: i eq {_odata_string(index_code)})"
+
+
+def _sector_filter(sector: Optional[str]) -> Optional[str]:
+    """OData clause matching a sector, or None when no sector is given."""
+    if not sector:
         return None
+    return f"Sector eq {_odata_string(sector)}"
+
+
+def _and_filters(first: Optional[str], second: Optional[str]) -> Optional[str]:
+    """AND together two optional OData clauses; None when both are missing."""
+    if first and second:
+        return f"{first} and {second}"
+    return first or second
+
+
+def _filter_list_select(metric_filter: Optional[Dict[str, Any]]) -> str:
+    """Select string for filtered list modes: essential fields + filtered metric."""
+    metric_name = metric_filter.get("metric") if metric_filter else None
+    if metric_name and metric_name not in _FILTER_LIST_SELECT_FIELDS:
+        return f"{_FILTER_LIST_SELECT},{metric_name}"
+    return _FILTER_LIST_SELECT
+
+
+def _list_payload(select: str, filter_str: Optional[str]) -> Dict[str, Any]:
+    """Payload for list modes: match-all search, top 50 with count, optional filter."""
+    payload: Dict[str, Any] = {
+        "search": "*",
+        "top": 50,
+        "select": select,
+        "count": True
+    }
+    if filter_str:
+        payload["filter"] = filter_str
+    return payload
+
+
+# ============================================================
+# Per-mode payload builders
+# ============================================================
+
+def _build_single_stock_metric(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Single stock metric query (e.g., "pe of reliance")."""
+    metric = spec["metric"]
+    # Build minimal select: essential fields + requested metric
+    if metric in _STOCK_ESSENTIAL_FIELDS:
+        select_fields = STOCK_SEARCH_FIELDS
+    else:
+        select_fields = f"{STOCK_SEARCH_FIELDS},{metric}"
+
+    return {
+        "search": spec["stock_query"],
+        "searchFields": STOCK_SEARCH_FIELDS,
+        "top": 1,
+        "select": select_fields
+    }
+
+
+def _build_single_stock_overview(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Single stock overview (e.g., "infosys")."""
+    return {
+        "search": spec["stock_query"],
+        "searchFields": STOCK_SEARCH_FIELDS,
+        "top": 1,
+        "select": OVERVIEW_SELECT
+    }
+
+
+def _build_list_by_index(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """List by index (e.g., "nifty 50")."""
+    index_code = spec.get("index_code")
+    filter_str = _index_filter(index_code)
+    return _list_payload(OVERVIEW_SELECT, filter_str)
+
 
-    return f"{metric} {op} {value}"
+def _build_list_by_sector(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """List by sector (e.g., "banking stocks")."""
+    sector = spec.get("sector")
+    filter_str = _sector_filter(sector)
+    return _list_payload(OVERVIEW_SELECT, filter_str)
+
+
+def _build_list_by_index_and_sector(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Index + Sector combination (e.g., "nifty 50 banking stocks")."""
+    index_code = spec.get("index_code")
+    sector = spec.get("sector")
+    filter_str = _and_filters(
+        _index_filter(index_code),
+        _sector_filter(sector)
+    )
+    return _list_payload(OVERVIEW_SELECT, filter_str)
+
+
+def _build_list_by_metric_filter(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Metric filter, optionally narrowed by index or sector
+    (e.g., "stocks with pe less than 20", "nifty 50 stocks with pe less than 50"
+    or "it stocks with pe more than 40").
+    """
+    index_code = spec.get("index_code")
+    metric_filter = spec.get("metric_filter")
+    filter_str = _and_filters(
+        _and_filters(_index_filter(index_code), _sector_filter(spec.get("sector"))),
+        build_metric_filter_odata(metric_filter)
+    )
+    # Build select clause with essential fields + filtered metric
+    sel = _filter_list_select(metric_filter)
+    if index_code:
+        sel += ",AllIndices"
+    return _list_payload(sel, filter_str)
+
+
+def _build_overview_fallback(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Fallback for unknown modes: treat as overview search of the raw input."""
+    return {
+        "search": spec.get("stock_query") or spec["raw"]["input"],
+        "searchFields": STOCK_SEARCH_FIELDS,
+        "top": 1,
+        "select": OVERVIEW_SELECT
+    }
+
+
+# Mode -> payload builder. Modes not listed take _build_overview_fallback.
+_MODE_HANDLERS = {
+    "single_stock_metric": _build_single_stock_metric,
+    "single_stock_overview": _build_single_stock_overview,
+    "list_by_index": _build_list_by_index,
+    "list_by_sector": _build_list_by_sector,
+    "list_by_index_and_sector": _build_list_by_index_and_sector,
+    "list_by_sector_and_metric_filter": _build_list_by_metric_filter,
+    "list_by_metric_filter": _build_list_by_metric_filter,
+}
+
+
+def _payload_cache_key(spec: Dict[str, Any]) -> Tuple:
+    """
+    Reduce a spec to the hashable fields that determine its payload.
+    
+    Only fields the payload reads are included, so specs that differ just in
+    their raw input text (e.g. "banking stocks" vs "Banking  Stocks") share a key.
+    """
+    mode = spec["mode"]
+    search = spec.get("stock_query")
+    if mode not in _MODE_HANDLERS:
+        # The fallback searches the raw input when no stock name was extracted
+        search = search or spec["raw"]["input"]
+    metric_filter = spec.get("metric_filter")
+    if metric_filter:
+        metric_filter = (metric_filter.get("metric"), metric_filter.get("op"), metric_filter.get("value"))
+    return (mode, search, spec.get("metric"), spec.get("index_code"), spec.get("sector"), metric_filter)
+
+
+@functools.lru_cache(maxsize=1024)
+def _build_search_payload_cached(key: Tuple) -> Dict[str, Any]:
+    """Build the payload for a _payload_cache_key() tuple (memoized)."""
+    mode, search, metric, index_code, sector, metric_filter = key
+    spec: Dict[str, Any] = {
+        "mode": mode,
+        "stock_query": search,
+        "metric": metric,
+        "index_code": index_code,
+        "sector": sector,
+        "metric_filter": None,
+        "raw": {"input": search},
+    }
+    if metric_filter:
+        spec["metric_filter"] = {"metric": metric_filter[0], "op": metric_filter[1], "value": metric_filter[2]}
+    return _MODE_HANDLERS.get(mode, _build_overview_fallback)(spec)
 
 
 def build_search_payload_from_spec(spec: Dict[str, Any]) -> Dict[str, Any]:
@@ -46,168 +250,7 @@ def build_search_payload_from_spec(spec: Dict[str, Any]) -> Dict[str, Any]:
     Note:
         This function only builds the JSON body - it does NOT include URL or headers.
         Those are added by the caller (app.py or app_sdk.py).
+        Payloads are memoized per spec content; each call returns a fresh
+        shallow copy, so callers may modify the top-level keys.
     """
-    mode = spec["mode"]
-
-    # Common baseline select set for overviews
-    overview_select = "Symbol,SymbolRaw,Name,Sector,MarketCapCr,PE,PB,EPS,DividendYieldPct,AllIndices"
-
-    # 1) Single stock metric query (e.g., "pe of reliance")
-    if mode == "single_stock_metric":
-        metric = spec["metric"]
-        # Build minimal select: essential fields + requested metric
-        essential_fields = ["SymbolRaw", "Name", "Symbol"]
-        if metric not in essential_fields:
-            essential_fields.append(metric)
-        select_fields = ",".join(essential_fields)
-        
-        payload = {
-            "search": spec["stock_query"],
-            "searchFields": "SymbolRaw,Name,Symbol",
-            "top": 1,
-            "select": select_fields
-        }
-        return payload
-
-    # 2) Single stock overview (e.g., "infosys")
-    if mode == "single_stock_overview":
-        payload = {
-            "search": spec["stock_query"],
-            "searchFields": "SymbolRaw,Name,Symbol",
-            "top": 1,
-            "select": overview_select
-        }
-        return payload
-
-    # 3) List by index (e.g., "nifty 50")
-    if mode == "list_by_index":
-        index_code = spec.get("index_code")
-        filter_clauses = []
-        if index_code:
-            filter_clauses.append(f"AllIndices/any(i: i eq '{index_code}')")
-        filter_str = " and ".join(filter_clauses) if filter_clauses else None
-
-        payload: Dict[str, Any] = {
-            "search": "*",
-            "top": 50,
-            "select": overview_select,
-            "count": True
-        }
-        if filter_str:
-            payload["filter"] = filter_str
-        return payload
-
-    # 4) List by sector (e.g., "banking stocks")
-    if mode == "list_by_sector":
-        sector = spec.get("sector")
-        filter_str = f"Sector eq '{sector}'" if sector else None
-
-        payload: Dict[str, Any] = {
-            "search": "*",
-            "top": 50,
-            "select": overview_select,
-            "count": True
-        }
-        if filter_str:
-            payload["filter"] = filter_str
-        return payload
-
-    # 5) Index + Sector combination (e.g., "nifty 50 banking stocks")
-    if mode == "list_by_index_and_sector":
-        index_code = spec.get("index_code")
-        sector = spec.get("sector")
-        
-        filter_clauses = []
-        if index_code:
-            filter_clauses.append(f"AllIndices/any(i: i eq '{index_code}')")
-        if sector:
-            filter_clauses.append(f"Sector eq '{sector}'")
-        
-        filter_str = " and ".join(filter_clauses) if filter_clauses else None
-
-        payload: Dict[str, Any] = {
-            "search": "*",
-            "top": 50,
-            "select": overview_select,
-            "count": True
-        }
-        if filter_str:
-            payload["filter"] = filter_str
-        return payload
-
-    # 6) Sector + Metric filter (e.g., "it stocks with pe more than 40")
-    if mode == "list_by_sector_and_metric_filter":
-        sector = spec.get("sector")
-        metric_filter = spec.get("metric_filter")
-        
-        filter_clauses = []
-        if sector:
-            filter_clauses.append(f"Sector eq '{sector}'")
-        
-        metric_odata = build_metric_filter_odata(metric_filter)
-        if metric_odata:
-            filter_clauses.append(metric_odata)
-        
-        filter_str = " and ".join(filter_clauses) if filter_clauses else None
-        
-        # Build select clause with essential fields + filtered metric
-        select_fields = ["SymbolRaw", "Name", "Symbol", "Sector"]
-        if metric_filter and metric_filter.get("metric"):
-            metric_name = metric_filter["metric"]
-            if metric_name not in select_fields:
-                select_fields.append(metric_name)
-        sel = ",".join(select_fields)
-        
-        payload: Dict[str, Any] = {
-            "search": "*",
-            "top": 50,
-            "select": sel,
-            "count": True
-        }
-        if filter_str:
-            payload["filter"] = filter_str
-        return payload
-
-    # 7) Metric filter (with or without index) (e.g., "stocks with pe less than 20" or "nifty 50 stocks with pe less than 50")
-    if mode == "list_by_metric_filter":
-        index_code = spec.get("index_code")
-        metric_filter = spec.get("metric_filter")
-
-        filter_clauses = []
-
-        if index_code:
-            filter_clauses.append(f"AllIndices/any(i: i eq '{index_code}')")
-
-        metric_odata = build_metric_filter_odata(metric_filter)
-        if metric_odata:
-            filter_clauses.append(metric_odata)
-
-        filter_str = " and ".join(filter_clauses) if filter_clauses else None
-
-        # Build select clause with essential fields + filtered metric
-        select_fields = ["SymbolRaw", "Name", "Symbol", "Sector"]
-        if metric_filter and metric_filter.get("metric"):
-            metric_name = metric_filter["metric"]
-            if metric_name not in select_fields:
-                select_fields.append(metric_name)
-        if index_code:
-            select_fields.append("AllIndices")
-        sel = ",".join(select_fields)
-        
-        payload: Dict[str, Any] = {
-            "search": "*",
-            "top": 50,
-            "select": sel,
-            "count": True
-        }
-        if filter_str:
-            payload["filter"] = filter_str
-        return payload
-
-    # Fallback: treat as overview search
-    return {
-        "search": spec.get("stock_query") or spec["raw"]["input"],
-        "searchFields": "SymbolRaw,Name,Symbol",
-        "top": 1,
-        "select": overview_select
-    }
+    return dict(_build_search_payload_cached(_payload_cache_key(spec)))
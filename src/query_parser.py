@@ -7,7 +7,10 @@ It's shared across app.py, app_sdk.py, and streamlit_app.py to avoid code duplic
 """
 
 import re
-from typing import Dict, Any, Optional
+import functools
+from collections import deque
+from types import MappingProxyType
+from typing import Dict, Any, List, Optional, Tuple
 
 # ============================================================
 # Configuration: Metrics, Indices, Sectors, Comparators
@@ -202,7 +205,7 @@ INDEX_ALIASES = {
     "nifty real estate": "NIFTYREALTY",
 }
 
-COMPARATOR_ALIASES = {
+COMPARATOR_ALIASES = MappingProxyType({
     ">": "gt",
     "greater than": "gt",
     "higher than": "gt",
@@ -220,21 +223,164 @@ COMPARATOR_ALIASES = {
     "at least": "ge",
     "<=": "le",
     "at most": "le",
-}
+})
 
-STOPWORDS_FOR_STOCK = {
+STOPWORDS_FOR_STOCK = frozenset({
     "what", "is", "the", "of", "for", "give", "me", "show",
     "tell", "stock", "stocks", "share", "shares",
     "price", "pe", "p/e", "eps",
     "dividend", "yield", "market", "cap", "in", "on", "all",
     # Add explicit sector modifiers that indicate sector queries, not stock names
     "sector", "sectors", "industry"
-}
+})
+
+# Words that indicate a sector/listing query rather than a company name
+SECTOR_MODIFIERS = frozenset({
+    "all", "top", "best", "good", "leading", "major", "large", "small",
+    "sector", "stocks", "companies", "list", "show", "get", "find"
+})
+
+
+# Words that explicitly ask for a sector listing, even alongside a metric
+EXPLICIT_SECTOR_WORDS = frozenset({"sector", "sectors", "industry"})
+
+
+# Metric columns that hold text rather than numbers and cannot be range-filtered
+NON_NUMERIC_METRIC_COLUMNS = frozenset({"Sector"})
+
+# Precompiled patterns (compiled once at import instead of on every query)
+#
+# The metric and comparator alternations are generated from METRIC_ALIASES and
+# COMPARATOR_ALIASES, longest phrase first. Python's re picks the first
+# alternative that matches at a position, so longest-first ordering gives
+# longest-match semantics ("dividend yield" over "dividend", ">=" over ">")
+# without hand-ordering the pattern, and every captured phrase is a dict key.
+# The metric phrase must stand on word boundaries, like the alias automaton
+# below, so "pe" is not read out of "open".
+def _longest_first_alternation(phrases) -> str:
+    """Build a regex alternation of literal phrases, longest phrase first."""
+    return "|".join(re.escape(phrase) for phrase in sorted(phrases, key=len, reverse=True))
+
+
+_METRIC_FILTER_RE = re.compile(
+    r"(?<![a-z0-9])(" + _longest_first_alternation(
+        p for p, col in METRIC_ALIASES.items() if col not in NON_NUMERIC_METRIC_COLUMNS
+    ) + r")(?![a-z0-9])"
+    r".*?"
+    r"(" + _longest_first_alternation(COMPARATOR_ALIASES) + r")"
+    r"\s*([\d\.]+)"
+)
+_TOKEN_RE = re.compile(r"[a-zA-Z0-9&.\-]+")
 
 
 def normalize(text: str) -> str:
     """Normalize text by lowercasing and removing extra whitespace."""
-    return " ".join(text.lower().strip().split())
+    # split() with no argument already drops leading/trailing whitespace and
+    # treats tabs and newlines as separators, so no strip()/translate() pass
+    return " ".join(text.lower().split())
+
+
+# ============================================================
+# Alias matching - multi-pattern longest-match automaton
+# ============================================================
+
+class _AliasAutomaton:
+    """
+    Aho-Corasick automaton over the phrases of one or more alias dictionaries.
+
+    Finds the longest alias phrase of every dictionary occurring in the text
+    with a single left-to-right pass, instead of one substring scan per phrase.
+    A match only counts when it starts and ends on a word boundary, so "it"
+    does not fire inside "with" and "nifty 50" does not fire inside "nifty 500".
+    Equal-length matches resolve to the phrase listed first in its dictionary.
+
+    The automaton is built once at import time; lookups are read-only.
+    """
+
+    def __init__(self, *alias_tables: Dict[str, str]):
+        self._table_count = len(alias_tables)
+        goto = [{}]
+        # Own outputs per state: {table_index: (phrase_len, -insertion_order, phrase, value)},
+        # so the best match for a table is simply the largest tuple seen during the scan
+        own = [{}]
+        for table_index, aliases in enumerate(alias_tables):
+            for order, (phrase, value) in enumerate(aliases.items()):
+                state = 0
+                for ch in phrase:
+                    nxt = goto[state].get(ch)
+                    if nxt is None:
+                        nxt = len(goto)
+                        goto.append({})
+                        own.append({})
+                        goto[state][ch] = nxt
+                    state = nxt
+                own[state][table_index] = (len(phrase), -order, phrase, value)
+
+        # Breadth-first pass: resolve failure links into a full transition table
+        # (delta) and inherit every suffix output. All suffixes are kept, not just
+        # the longest per table, because a longer phrase may fail the word-boundary
+        # check where a shorter one passes ("gas" in "foil and gas").
+        fail = [0] * len(goto)
+        delta = [None] * len(goto)
+        merged = [None] * len(goto)
+        delta[0] = dict(goto[0])
+        merged[0] = ()
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            transitions = dict(delta[fail[state]])
+            transitions.update(goto[state])
+            delta[state] = transitions
+            merged[state] = tuple(own[state].items()) + merged[fail[state]]
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(ch, 0) if state else 0
+                queue.append(nxt)
+
+        self._delta = delta
+        # Tuples of (table_index, hit) pairs; None for states with no output
+        self._output = [outputs or None for outputs in merged]
+
+    def longest_matches(self, text: str) -> Tuple[Optional[Tuple[str, str]], ...]:
+        """Return (phrase, value) of the longest alias found per table, or None per table."""
+        delta = self._delta
+        output = self._output
+        best = [None] * self._table_count
+        last = len(text) - 1
+        state = 0
+        for end, ch in enumerate(text):
+            state = delta[state].get(ch, 0)
+            hits = output[state]
+            if hits is None:
+                continue
+            # Every hit ends here, so the trailing boundary is checked once
+            if end < last and text[end + 1].isalnum():
+                continue
+            for table_index, hit in hits:
+                before = end - hit[0]
+                if before >= 0 and text[before].isalnum():
+                    continue
+                current = best[table_index]
+                if current is None or hit > current:
+                    best[table_index] = hit
+        return tuple((hit[2], hit[3]) if hit else None for hit in best)
+
+
+# One automaton covers all three alias tables: (metric, index, sector)
+_ALIAS_AUTOMATON = _AliasAutomaton(METRIC_ALIASES, INDEX_ALIASES, SECTOR_ALIASES)
+
+
+@functools.lru_cache(maxsize=1024)
+def _scan_aliases(text_lower: str) -> Tuple[Optional[Tuple[str, str]], ...]:
+    """
+    Scan normalized text once for metric, index and sector aliases.
+    
+    Memoized so that detect_metric, detect_index_code and detect_sector, which
+    run back to back on the same text, share a single pass.
+    
+    Returns:
+        (metric_match, index_match, sector_match), each (phrase, value) or None
+    """
+    return _ALIAS_AUTOMATON.longest_matches(text_lower)
 
 
 # ============================================================
@@ -258,12 +404,10 @@ def detect_metric(text_lower: str) -> Optional[Dict[str, Any]]:
         "pe ratio" -> {"phrase": "pe ratio", "column": "PE_Ratio"}
         "market cap" -> {"phrase": "market cap", "column": "Market_Cap"}
     """
-    best = None
-    for phrase, col in METRIC_ALIASES.items():
-        if phrase in text_lower:
-            if best is None or len(phrase) > len(best["phrase"]):
-                best = {"phrase": phrase, "column": col}
-    return best
+    match = _scan_aliases(text_lower)[0]
+    if match is None:
+        return None
+    return {"phrase": match[0], "column": match[1]}
 
 
 def detect_index_code(text_lower: str) -> Optional[str]:
@@ -281,15 +425,11 @@ def detect_index_code(text_lower: str) -> Optional[str]:
         "sensex stocks" -> "SENSEX"
         "nifty bank" -> "NIFTY BANK"
     """
-    best = None
-    for phrase, code in INDEX_ALIASES.items():
-        if phrase in text_lower:
-            if best is None or len(phrase) > len(best["phrase"]):
-                best = {"phrase": phrase, "code": code}
-    return best["code"] if best else None
+    match = _scan_aliases(text_lower)[1]
+    return match[1] if match else None
 
 
-def detect_sector(text_lower: str, original_text: str) -> Optional[str]:
+def detect_sector(text_lower: str, words_in_query: List[str]) -> Optional[str]:
     """
     Detect sector from user input with company-name protection.
     
@@ -298,7 +438,7 @@ def detect_sector(text_lower: str, original_text: str) -> Optional[str]:
     
     Args:
         text_lower: Lowercase normalized user query
-        original_text: Original user query (preserves capitalization)
+        words_in_query: text_lower.split(), computed once by the caller
         
     Returns:
         Sector name string (e.g., "Banking", "IT", "Automobile")
@@ -308,29 +448,15 @@ def detect_sector(text_lower: str, original_text: str) -> Optional[str]:
         "banking stocks" -> "Banking" (sector filter)
         "axis bank" -> None (company name, not sector)
     """
-    
-    # Words that indicate a sector/listing query rather than a company name
-    sector_modifiers = {
-        "all", "top", "best", "good", "leading", "major", "large", "small",
-        "sector", "stocks", "companies", "list", "show", "get", "find"
-    }
-
-    best = None
-    for phrase, sector in SECTOR_ALIASES.items():
-        if phrase in text_lower:
-            if best is None or len(phrase) > len(best["phrase"]):
-                best = {"phrase": phrase, "sector": sector}
-    
-    if best is None:
+    match = _scan_aliases(text_lower)[2]
+    if match is None:
         return None
+    sector = match[1]
     
     # Check if it's likely a company name vs sector query
-    phrase = best["phrase"]
-    words_in_query = text_lower.split()
-    
     # If query has sector modifiers, it's definitely a sector query
-    if any(mod in words_in_query for mod in sector_modifiers):
-        return best["sector"]
+    if not SECTOR_MODIFIERS.isdisjoint(words_in_query):
+        return sector
     
     # If query is very short (1-2 words) without modifiers, likely a company name
     # Examples: "bajaj auto", "axis bank", "reliance" (company names)
@@ -347,7 +473,7 @@ def detect_sector(text_lower: str, original_text: str) -> Optional[str]:
             # unless it's a very specific match (keep sector detection)
             pass
     
-    return best["sector"]
+    return sector
 
 
 def detect_metric_filter(text_lower: str) -> Optional[Dict[str, Any]]:
@@ -357,11 +483,7 @@ def detect_metric_filter(text_lower: str) -> Optional[Dict[str, Any]]:
     Returns:
         Dictionary with metric, operator, value, and raw phrases, or None
     """
-    metric_pattern = r"(market cap|marketcap|pb|p/b|pe|p/e|eps|dividend yield|dividend|price|share price|market price)"
-    comp_pattern = r"(>=|<=|>|<|greater than|more than|above|over|less than|under|below|at least|at most)"
-    regex = re.compile(metric_pattern + r".*?" + comp_pattern + r"\s*([\d\.]+)")
-
-    m = regex.search(text_lower)
+    m = _METRIC_FILTER_RE.search(text_lower)
     if not m:
         return None
 
@@ -369,13 +491,9 @@ def detect_metric_filter(text_lower: str) -> Optional[Dict[str, Any]]:
     comp_phrase = m.group(2)
     value_str = m.group(3)
 
-    metric_col = METRIC_ALIASES.get(metric_phrase)
-    if not metric_col:
-        return None
-
-    op = COMPARATOR_ALIASES.get(comp_phrase)
-    if not op:
-        return None
+    # Both alternations are generated from the alias tables, so lookups always hit
+    metric_col = METRIC_ALIASES[metric_phrase]
+    op = COMPARATOR_ALIASES[comp_phrase]
 
     try:
         value = float(value_str)
@@ -397,11 +515,11 @@ def extract_stock_query(original: str, text_lower: str, metric_info: Optional[Di
     
     Preserves company names even if they contain sector keywords (e.g., 'axis bank', 'bajaj auto').
     """
-    tokens = re.findall(r"[a-zA-Z0-9&.\-]+", text_lower)
+    tokens = _TOKEN_RE.findall(text_lower)
     if metric_info:
-        metric_tokens = metric_info["phrase"].split()
+        metric_tokens = frozenset(metric_info["phrase"].split())
     else:
-        metric_tokens = []
+        metric_tokens = frozenset()
 
     filtered = []
     for tok in tokens:
@@ -420,6 +538,7 @@ def extract_stock_query(original: str, text_lower: str, metric_info: Optional[Di
 # Main query parsing: user text -> spec
 # ============================================================
 
+@functools.lru_cache(maxsize=1024)
 def parse_user_query(user_input: str) -> Dict[str, Any]:
     """
     Core router: Analyze user input and determine query mode with parameters.
@@ -427,6 +546,9 @@ def parse_user_query(user_input: str) -> Dict[str, Any]:
     This is the most important function - it interprets natural language queries
     and converts them into structured search specifications.
     
+    Memoized per input string, so repeated queries skip detection entirely.
+    The returned spec is shared between calls and must be treated as read-only.
+    
     Args:
         user_input: Raw user query string (e.g., "pe of infy", "nifty 50 banking stocks")
         
@@ -463,11 +585,14 @@ def parse_user_query(user_input: str) -> Dict[str, Any]:
     """
     original = user_input
     text_lower = normalize(user_input)
+    words_in_query = text_lower.split()
 
     metric_info = detect_metric(text_lower)
     index_code = detect_index_code(text_lower)
-    sector = detect_sector(text_lower, original)
-    metric_filter = detect_metric_filter(text_lower)
+    sector = detect_sector(text_lower, words_in_query)
+    # Filter phrases are a subset of METRIC_ALIASES: without any metric alias in
+    # the text the filter regex cannot match, so skip that pass entirely
+    metric_filter = detect_metric_filter(text_lower) if metric_info else None
 
     # 1) Index + Metric filter combination (e.g., "nifty 50 stocks with pe less than 50")
     if index_code is not None and metric_filter is not None:
@@ -515,12 +640,14 @@ def parse_user_query(user_input: str) -> Dict[str, Any]:
     # 4) Single stock metric (e.g., "pe of reliance", "axis bank pe")
     # CHECK THIS BEFORE SECTOR to handle cases like "axis bank pe" correctly
     # If user asks for a metric, it's likely a stock query, not a sector query
-    if metric_info:
+    # A comparator with a value ("pe less than 20") is a screen, not a lookup,
+    # so leave it to the metric filter branch below
+    if metric_info and metric_filter is None:
         stock_query = extract_stock_query(original, text_lower, metric_info)
         if stock_query:
             # Only return single_stock_metric if the query doesn't have explicit sector modifiers
             # like "sector banking pe" which would be weird but possible
-            has_sector_modifier = any(word in text_lower.split() for word in ["sector", "sectors", "industry"])
+            has_sector_modifier = not EXPLICIT_SECTOR_WORDS.isdisjoint(words_in_query)
             if not has_sector_modifier:
                 return {
                     "mode": "single_stock_metric",